@@ -12,11 +12,78 @@ Tested with Python 3.12.2
 
 Comments to: yvs9j135@duck.com
 '''
+import json
+import os
 import sys
-import requests
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import httpx
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 UA_STRING = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
 
+# One HTTP/2 client for every call so all requests to quack.duckduckgo.com
+# are multiplexed over a single connection.  The keep-alive outlasts
+# WARM_INTERVAL so the pings sent during the OTP prompt keep it open.
+CLIENT = httpx.Client(
+    http2=True,
+    headers={'User-Agent': UA_STRING},
+    timeout=30,
+    limits=httpx.Limits(keepalive_expiry=120)
+)
+
+LOGINLINK_URL = 'https://quack.duckduckgo.com/api/auth/loginlink'
+LOGIN_URL = 'https://quack.duckduckgo.com/api/auth/login'
+BASE_URL = 'https://quack.duckduckgo.com/'
+DASHBOARD_URL = 'https://quack.duckduckgo.com/api/email/dashboard'
+ADDR_URL = 'https://quack.duckduckgo.com/api/email/addresses'
+
+WARM_INTERVAL = 30
+
+CACHE_FILE = os.path.expanduser('~/.cache/ducktoken.json')
+CACHE_TTL = 3600
+
+
+def warm_up_connection() -> None:
+    '''
+    Opens the connection to DuckDuckGo ahead of the first API call.
+
+    This is run in the background while the user answers the prompts so the
+    TCP and TLS handshakes are already done when the first real request is made.
+    Any error is ignored; the real request will simply open its own connection.
+
+    Returns:
+      None.
+    '''
+
+    try:
+        CLIENT.head(BASE_URL, timeout=10)
+    except httpx.HTTPError:
+        pass
+
+
+def keep_connection_warm(stop: threading.Event) -> None:
+    '''
+    Pings DuckDuckGo every WARM_INTERVAL seconds until stop is set.
+
+    This is run in the background while waiting for the OTP, which can take
+    minutes to arrive, so the login request still finds an open connection.
+
+    Args:
+      stop: Event set once the user has entered the OTP.
+
+    Returns:
+      None.
+    '''
+
+    while not stop.wait(WARM_INTERVAL):
+        warm_up_connection()
+
 
 def get_count_of_addresses() -> int:
     '''
@@ -80,23 +147,17 @@ def send_otp_email(duck_user: str) -> None:
       None. The function primarily prints the status code and doesn't return data.
 
     Raises:
-      requests.exceptions.RequestException: If an error occurs during the request.
+      httpx.HTTPError: If an error occurs during the request.
 
     Examples:
       >>> send_otp_email("my_username")
       200  # If the request is successful
     '''
 
-    headers = {'User-Agent': UA_STRING}
-
     try:
-        response = requests.get(
-            f'https://quack.duckduckgo.com/api/auth/loginlink?user={duck_user}',
-            headers=headers,
-            timeout=30
-        )
+        response = CLIENT.get(LOGINLINK_URL, params={'user': duck_user})
         response.raise_for_status()  # Raise exception for non-2xx status codes
-    except requests.exceptions.RequestException as err:
+    except httpx.HTTPError as err:
         print(f'Error making web call: {err}')
         sys.exit(1)
 
@@ -118,7 +179,7 @@ def get_token(duck_user: str) -> str:
       The retrieved authentication token as a string, or raises an exception.
 
     Raises:
-      requests.exceptions.RequestException: If an error occurs during the request.
+      httpx.HTTPError: If an error occurs during the request.
       ValueError: If the OTP input contains spaces or is invalid.
 
     Examples:
@@ -126,21 +187,18 @@ def get_token(duck_user: str) -> str:
       print(f"Your token is {token}")
     '''
 
-    headers = {
-        'User-Agent': UA_STRING
-    }
+    stop_warming = threading.Event()
+    threading.Thread(target=keep_connection_warm, args=(stop_warming,), daemon=True).start()
 
     try:
         otp_input = input("Please enter the OTP from your email: ")
-        otp_input.replace(' ', '+')
+        stop_warming.set()
 
-        response = requests.get(
-            f'https://quack.duckduckgo.com/api/auth/login?otp={otp_input}&user={duck_user}',
-            headers=headers,
-            timeout=30
-        ).json()
+        response = CLIENT.get(LOGIN_URL, params={'otp': otp_input, 'user': duck_user})
+        response.raise_for_status()
+        response = json_loads(response.content)
 
-    except requests.exceptions.RequestException as err:
+    except (httpx.HTTPError, ValueError) as err:
         print(f'Error using OTP to get token: {err}')
         sys.exit(1)
 
@@ -169,9 +227,9 @@ def get_bearer_token(a_token: str) -> str:
      The retrieved bearer token as a string, or raises an exception on failure.
 
    Raises:
-     requests.exceptions.RequestException: If an error occurs during the request.
+     httpx.HTTPError: If an error occurs during the request.
      ValueError: If the OTP input contains spaces or is invalid.
-     requests.exceptions.HTTPError: If the API request fails with a non-2xx status code.
+     httpx.HTTPStatusError: If the API request fails with a non-2xx status code.
 
    Examples:
      >>> bearer_token = get_bearer_token("YOUR_AUTHENTICATION_TOKEN")
@@ -181,19 +239,14 @@ def get_bearer_token(a_token: str) -> str:
     if not a_token:
         raise ValueError(f'Authentication token {a_token} cannot be empty.')
 
-    headers = {
-        'User-Agent': UA_STRING,
-        'Authorization': f'Bearer {a_token}'
-    }
+    headers = {'Authorization': f'Bearer {a_token}'}
 
     try:
-        response = requests.get(
-            'https://quack.duckduckgo.com/api/email/dashboard',
-            headers=headers,
-            timeout=30
-        ).json()
+        response = CLIENT.get(DASHBOARD_URL, headers=headers)
+        response.raise_for_status()
+        response = json_loads(response.content)
 
-    except requests.exceptions.RequestException as err:
+    except (httpx.HTTPError, ValueError) as err:
         print(f'Error getting bearer token: {err}')
         sys.exit(1)
 
@@ -206,24 +259,144 @@ def get_bearer_token(a_token: str) -> str:
     return b_token
 
 
-def get_email_addresses(count: int, b_token: str) -> None:
+def _read_token_cache() -> dict:
+    '''
+    Reads the bearer token cache file.
+
+    Returns:
+      The cached entries keyed by username, or an empty dict if the file is
+      missing, unreadable or malformed.
+    '''
+
+    try:
+        with open(CACHE_FILE, encoding='utf-8') as cache:
+            tokens = json.load(cache)
+    except (OSError, ValueError):
+        return {}
+
+    return tokens if isinstance(tokens, dict) else {}
+
+
+def _write_token_cache(tokens: dict) -> None:
+    '''
+    Writes the bearer token cache file, readable only by the current user.
+
+    Args:
+      tokens: The cache entries keyed by username.
+
+    Returns:
+      None. Failing to write the cache is reported but not fatal.
+    '''
+
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        fd = os.open(CACHE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(CACHE_FILE, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as cache:
+            json.dump(tokens, cache)
+    except OSError as err:
+        print(f'Unable to update token cache: {err}')
+
+
+def load_cached_token(duck_user: str) -> str | None:
+    '''
+    Returns a previously stored bearer token for the user if it has not expired.
+
+    Args:
+      duck_user: The DuckDuckGo username (without "@duck.com") the token belongs to.
+
+    Returns:
+      The cached bearer token as a string, or None if there is no valid entry.
+    '''
+
+    entry = _read_token_cache().get(duck_user)
+    if not isinstance(entry, dict):
+        return None
+
+    token, expires = entry.get('token'), entry.get('expires')
+    if not isinstance(token, str) or not isinstance(expires, (int, float)):
+        return None
+
+    return token if expires > time.time() else None
+
+
+def store_cached_token(duck_user: str, b_token: str, ttl: int = CACHE_TTL) -> None:
+    '''
+    Saves a bearer token so later runs can skip the OTP login.
+
+    The cache file is only readable by the current user since it holds a
+    credential. Failing to write the cache is not fatal.
+
+    Args:
+      duck_user: The DuckDuckGo username (without "@duck.com") the token belongs to.
+      b_token: The bearer token returned by get_bearer_token.
+      ttl: Number of seconds the token should be reused for.
+
+    Returns:
+      None.
+    '''
+
+    tokens = _read_token_cache()
+    tokens[duck_user] = {'token': b_token, 'expires': int(time.time()) + ttl}
+    _write_token_cache(tokens)
+
+
+def drop_cached_token(duck_user: str) -> None:
+    '''
+    Removes the user's bearer token from the cache, e.g. after it was rejected.
+
+    Args:
+      duck_user: The DuckDuckGo username (without "@duck.com") the token belongs to.
+
+    Returns:
+      None.
+    '''
+
+    tokens = _read_token_cache()
+    if tokens.pop(duck_user, None) is not None:
+        _write_token_cache(tokens)
+
+
+def login(duck_user: str) -> str:
+    '''
+    Runs the OTP login and caches the resulting bearer token.
+
+    Args:
+      duck_user: The DuckDuckGo username (without "@duck.com") to log in as.
+
+    Returns:
+      The new bearer token as a string.
+    '''
+
+    send_otp_email(duck_user)
+    a_token = get_token(duck_user)
+    b_token = get_bearer_token(a_token)
+    store_cached_token(duck_user, b_token)
+
+    return b_token
+
+
+def get_email_addresses(count: int, b_token: str) -> bool:
     '''
     Fetches and prints requested number of email addresses using a DuckDuckGo API call.
 
     This function fetches a specified number of email addresses from DuckDuckGo's
-    email API using the provided access token. It iterates through the requested
-    count, making API calls and printing the retrieved email addresses.
+    email API using the provided access token. The requested number of API calls
+    are made concurrently and the retrieved email addresses are printed in order.
 
     Args:
       count: The number of email addresses to fetch (integer).
       b_token: A valid DuckDuckGo API access token (string).
 
     Returns:
-      None. The function primarily prints email addresses and doesn't return data.
+      False if DuckDuckGo rejected the token (nothing is printed in that case),
+      otherwise True once the email addresses have been printed.
 
     Raises:
-      requests.exceptions.RequestException: If an error occurs during the API calls.
       ValueError: If the requested count is invalid (non-positive).
+      SystemExit: If any address could not be created. Every address and error
+        is printed first; HTTP errors from the API calls are reported this way
+        rather than raised.
 
    Examples:
      >>> get_email_addresses(3, "YOUR_ACCESS_TOKEN")
@@ -236,28 +409,59 @@ def get_email_addresses(count: int, b_token: str) -> None:
     if count <= 0:
         raise ValueError("Count must be a positive integer.")
 
-    headers = {
-        'User-Agent': UA_STRING,
-        'Authorization': f'Bearer {b_token}'
-    }
+    headers = {'Authorization': f'Bearer {b_token}'}
+
+    def create_address() -> str:
+        response = CLIENT.post(ADDR_URL, headers=headers)
+        response.raise_for_status()
+        return json_loads(response.content)['address']
 
-    for i in range(count):
+    def result_of(future: Future) -> str | Exception:
         try:
-            response = requests.post(
-                'https://quack.duckduckgo.com/api/email/addresses',
-                headers=headers,
-                timeout=30
-            ).json()
-            email = response['address']
-            print(f'Email #{i+1}: {email}@duck.com')
-        except requests.exceptions.RequestException as err:
-            print(f'Error getting email #{i+1}: {err}')
-            sys.exit(1)
+            return future.result()
+        except (httpx.HTTPError, KeyError, TypeError, ValueError) as err:
+            return err
+
+    # The endpoint creates one address per call and has no batch parameter.
+    # The requests are independent, so issue them all at once (multiplexed
+    # over the HTTP/2 connection) and print in order
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(create_address) for _ in range(count)]
+        results = [result_of(future) for future in futures]
+
+    # A rejected token fails every request the same way, so nothing was created
+    if all(isinstance(result, httpx.HTTPStatusError)
+           and result.response.status_code in (401, 403) for result in results):
+        return False
+
+    # Report every result before exiting so addresses created by the other
+    # requests are not lost when one of them fails
+    failed = False
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f'Error getting email #{i+1}: {result!r}')
+            failed = True
+        else:
+            print(f'Email #{i+1}: {result}@duck.com')
+
+    if failed:
+        sys.exit(1)
 
+    return True
 
+
+threading.Thread(target=warm_up_connection, daemon=True).start()
 email_count = get_count_of_addresses()
 username = get_username()
-send_otp_email(username)
-token = get_token(username)
-bearer_token = get_bearer_token(token)
-get_email_addresses(email_count, bearer_token)
+bearer_token = load_cached_token(username)
+if bearer_token is not None and not get_email_addresses(email_count, bearer_token):
+    print('Cached token was rejected, logging in again.')
+    drop_cached_token(username)
+    bearer_token = None
+
+if bearer_token is None:
+    bearer_token = login(username)
+    if not get_email_addresses(email_count, bearer_token):
+        print('DuckDuckGo rejected the bearer token.')
+        drop_cached_token(username)
+        sys.exit(1)